@@ -0,0 +1,196 @@
+"""Tests for the Wyoming event handler."""
+
+import argparse
+import asyncio
+import enum
+import struct
+from typing import List
+
+from wyoming.audio import AudioChunk, AudioStart, AudioStop
+from wyoming.event import Event
+from wyoming.info import Describe, Info
+
+from wyoming_porcupine3.__main__ import (
+    DEFAULT_KEYWORD,
+    Detector,
+    Keyword,
+    Porcupine3EventHandler,
+    State,
+    _direct_process,
+)
+
+FRAME_LENGTH = 512
+DETECT_SAMPLE = 1234
+
+
+class FakePorcupine:
+    """Detects the keyword in frames that start with DETECT_SAMPLE."""
+
+    frame_length = FRAME_LENGTH
+
+    def __init__(self) -> None:
+        self.num_frames = 0
+        self.deleted = False
+
+    def process(self, pcm) -> int:
+        assert len(pcm) == FRAME_LENGTH
+        self.num_frames += 1
+        return 0 if pcm[0] == DETECT_SAMPLE else -1
+
+    def delete(self) -> None:
+        self.deleted = True
+
+
+class FakeDirectPorcupine(FakePorcupine):
+    """Exposes the private binding parts used to call Porcupine directly."""
+
+    class PicovoiceStatuses(enum.Enum):
+        SUCCESS = 0
+        INVALID_STATE = 1
+
+    _PICOVOICE_STATUS_TO_EXCEPTION = {PicovoiceStatuses.INVALID_STATE: RuntimeError}
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._handle = object()
+        self.num_direct_frames = 0
+
+    def _process_func(self, handle, pcm, result_ref) -> "PicovoiceStatuses":
+        assert handle is self._handle
+        self.num_direct_frames += 1
+        result_ref._obj.value = self.process(pcm)
+        return self.PicovoiceStatuses.SUCCESS
+
+    def _get_error_stack(self) -> List[str]:
+        return []
+
+
+def _make_state(max_cached_per_keyword: int = 8) -> State:
+    return State(
+        access_key="",
+        keywords={DEFAULT_KEYWORD: Keyword(language="en", name=DEFAULT_KEYWORD)},
+        max_cached_per_keyword=max_cached_per_keyword,
+    )
+
+
+def _make_handler(state: State, events: List[Event]) -> Porcupine3EventHandler:
+    cli_args = argparse.Namespace(sensitivity=0.5)
+    handler = Porcupine3EventHandler(Info(), cli_args, state, None, None)
+
+    async def write_event(event: Event) -> None:
+        events.append(event)
+
+    handler.write_event = write_event  # type: ignore[method-assign]
+    return handler
+
+
+def _chunk(audio: bytes) -> Event:
+    return AudioChunk(rate=16000, width=2, channels=1, audio=audio).event()
+
+
+def _stream_many_chunks(porcupine: FakePorcupine) -> None:
+    """Consecutive chunks must not trip over buffer exports."""
+
+    async def run() -> None:
+        state = _make_state()
+        state.cache_detector(DEFAULT_KEYWORD, Detector(porcupine, 0.5))
+
+        events: List[Event] = []
+        handler = _make_handler(state, events)
+
+        num_chunks = 2000
+        chunk_bytes = 2048
+        await handler.handle_event(AudioStart(rate=16000, width=2, channels=1).event())
+        for _ in range(num_chunks):
+            await handler.handle_event(_chunk(bytes(chunk_bytes)))
+
+        await handler.handle_event(AudioStop().event())
+
+        assert porcupine.num_frames == (num_chunks * chunk_bytes) // (FRAME_LENGTH * 2)
+        assert [e.type for e in events] == ["not-detected"]
+
+    asyncio.run(run())
+
+
+def test_stream_many_chunks() -> None:
+    _stream_many_chunks(FakePorcupine())
+
+
+def test_stream_many_chunks_direct() -> None:
+    porcupine = FakeDirectPorcupine()
+    _stream_many_chunks(porcupine)
+    assert porcupine.num_direct_frames == porcupine.num_frames
+
+
+def test_direct_process_fallback() -> None:
+    """Bindings without the private parts use Porcupine.process."""
+    assert _direct_process(FakePorcupine()) is None  # type: ignore[arg-type]
+
+    porcupine = FakeDirectPorcupine()
+    porcupine._get_error_stack = None  # type: ignore[assignment]
+    assert _direct_process(porcupine) is None  # type: ignore[arg-type]
+
+
+def test_detection_across_chunks() -> None:
+    async def run() -> None:
+        state = _make_state()
+        state.cache_detector(DEFAULT_KEYWORD, Detector(FakePorcupine(), 0.5))
+
+        events: List[Event] = []
+        handler = _make_handler(state, events)
+
+        samples = [0] * FRAME_LENGTH + [DETECT_SAMPLE] + [0] * (FRAME_LENGTH - 1)
+        audio = struct.pack(f"<{len(samples)}h", *samples)
+
+        await handler.handle_event(AudioStart(rate=16000, width=2, channels=1).event())
+
+        # Split frames across chunk boundaries
+        await handler.handle_event(_chunk(audio[:700]))
+        await handler.handle_event(_chunk(audio[700:]))
+        await handler.handle_event(AudioStop().event())
+
+        assert [e.type for e in events] == ["detection"]
+
+    asyncio.run(run())
+
+
+def test_event_dispatch() -> None:
+    async def run() -> None:
+        events: List[Event] = []
+        handler = _make_handler(_make_state(), events)
+
+        assert await handler.handle_event(Event(type="not-a-real-event"))
+        assert await handler.handle_event(Describe().event())
+        assert [e.type for e in events] == ["info"]
+        assert "not-a-real-event" not in Porcupine3EventHandler._HANDLERS
+
+    asyncio.run(run())
+
+
+def test_disconnect_caches_detector() -> None:
+    """Detectors are reused by the next client, or deleted if the cache is full."""
+
+    async def run() -> None:
+        state = _make_state(max_cached_per_keyword=1)
+        porcupine = FakePorcupine()
+        state.cache_detector(DEFAULT_KEYWORD, Detector(porcupine, 0.5))
+
+        handler = _make_handler(state, [])
+        await handler.handle_event(_chunk(bytes(FRAME_LENGTH * 2)))
+        assert state.num_cached[DEFAULT_KEYWORD] == 0
+
+        await handler.disconnect()
+        assert state.num_cached[DEFAULT_KEYWORD] == 1
+        assert not porcupine.deleted
+
+        # Cache is full, so another detector is deleted on disconnect
+        extra_porcupine = FakePorcupine()
+        other_handler = _make_handler(state, [])
+        other_handler.detector = Detector(extra_porcupine, 0.5)
+        other_handler.keyword_name = DEFAULT_KEYWORD
+        await other_handler.disconnect()
+
+        assert extra_porcupine.deleted
+        assert state.num_cached[DEFAULT_KEYWORD] == 1
+
+    asyncio.run(run())
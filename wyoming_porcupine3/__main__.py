@@ -1,28 +1,62 @@
 #!/usr/bin/env python3
 import argparse
+import array
 import asyncio
+import ctypes
+import itertools
 import logging
+import os
 import platform
-import struct
-import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
 
-import pvporcupine
 from wyoming.audio import AudioChunk, AudioChunkConverter, AudioStart, AudioStop
-from wyoming.event import Event
+from wyoming.event import Event, Eventable
 from wyoming.info import Attribution, Describe, Info, WakeModel, WakeProgram
 from wyoming.server import AsyncEventHandler, AsyncServer
 from wyoming.wake import Detect, Detection, NotDetected
 
 from . import __version__
 
+if TYPE_CHECKING:
+    # Imported in main() so --help/--version don't load the native library
+    import pvporcupine
+
 _LOGGER = logging.getLogger(__name__)
 _DIR = Path(__file__).parent
 
 DEFAULT_KEYWORD = "porcupine"
+DEFAULT_MAX_CACHED_PER_KEYWORD = 8
+
+# Language of Porcupine keywords without a language suffix
+_BUILTIN_LANGUAGE = "en"
+
+# language -> [porcupine keyword]
+_LANGUAGE_INDEX: Dict[str, List[str]] = {}
+
+# Audio format expected by Porcupine
+_RATE = 16000
+_WIDTH = 2
+_CHANNELS = 1
+
+# Consumed audio is only dropped from the buffer once this many bytes are read
+_COMPACT_BYTES = 65536
+
+# Audio is little-endian, array.array uses native byte order
+_BIG_ENDIAN = sys.byteorder == "big"
 
 
 @dataclass
@@ -35,20 +69,103 @@ class Keyword:
 
 @dataclass
 class Detector:
-    porcupine: pvporcupine.Porcupine
+    porcupine: "pvporcupine.Porcupine"
     sensitivity: float
 
 
+def _direct_process(
+    porcupine: "pvporcupine.Porcupine",
+) -> Optional[Callable[[memoryview, int], int]]:
+    """Call pv_porcupine_process on audio memory directly.
+
+    Porcupine.process copies every sample of a frame through Python ints into a
+    new ctypes array. The returned function passes a zero-copy view of the
+    audio bytes at an offset instead. Returns None if the binding doesn't
+    expose what's needed, or if the host isn't little-endian.
+    """
+    if _BIG_ENDIAN:
+        return None
+
+    # Private parts of the pvporcupine binding, any of which may change
+    process_func = getattr(porcupine, "_process_func", None)
+    handle = getattr(porcupine, "_handle", None)
+    statuses = getattr(type(porcupine), "PicovoiceStatuses", None)
+    status_to_exception = getattr(porcupine, "_PICOVOICE_STATUS_TO_EXCEPTION", None)
+    get_error_stack = getattr(porcupine, "_get_error_stack", None)
+    success = getattr(statuses, "SUCCESS", None)
+    if (
+        (process_func is None)
+        or (handle is None)
+        or (success is None)
+        or (status_to_exception is None)
+        or (get_error_stack is None)
+    ):
+        return None
+
+    frame_type = ctypes.c_short * porcupine.frame_length
+    result = ctypes.c_int()
+    result_ref = ctypes.byref(result)
+
+    def process(audio: memoryview, offset: int) -> int:
+        status = process_func(handle, frame_type.from_buffer(audio, offset), result_ref)
+        if status is not success:
+            # Same error as Porcupine.process
+            raise status_to_exception[status](
+                message="Processing failed",
+                message_stack=get_error_stack(),
+            )
+
+        return result.value
+
+    return process
+
+
+def _get_language_index(available_keywords: Iterable[str]) -> Dict[str, List[str]]:
+    """Group keywords by language, building the index on first use.
+
+    Keywords may end in a language suffix (name_fr). Built-in keywords without
+    one are English.
+    """
+    if not _LANGUAGE_INDEX:
+        for kw in sorted(available_keywords):
+            language = kw.rsplit("_", 1)[1] if "_" in kw else _BUILTIN_LANGUAGE
+            _LANGUAGE_INDEX.setdefault(language, []).append(kw)
+
+    return _LANGUAGE_INDEX
+
+
+def _event_type(eventable: Eventable) -> str:
+    """Wyoming only exposes event type strings through events."""
+    return eventable.event().type
+
+
+def _sensitivity_key(sensitivity: float) -> int:
+    """Cache key for a sensitivity, so nearly equal floats share detectors."""
+    return int(round(sensitivity * 1000))
+
+
 class State:
     """State of system"""
 
-    def __init__(self, access_key: str, keywords: Dict[str, Keyword]):
+    def __init__(
+        self,
+        access_key: str,
+        keywords: Dict[str, Keyword],
+        max_cached_per_keyword: int = DEFAULT_MAX_CACHED_PER_KEYWORD,
+    ):
         self.access_key = access_key
         self.keywords = keywords
+        self.max_cached_per_keyword = max_cached_per_keyword
+
+        # keyword name -> sensitivity key -> [detector]
+        # Only touched from the event loop without awaiting, so no lock is needed
+        self.detector_cache: Dict[str, Dict[int, List[Detector]]] = {}
+
+        # keyword name -> number of detectors in cache
+        self.num_cached: Dict[str, int] = {}
 
-        # keyword name -> [detector]
-        self.detector_cache: Dict[str, List[Detector]] = {}
-        self.detector_lock = asyncio.Lock()
+        # Porcupine releases the GIL while processing, so clients run in parallel
+        self.executor = ThreadPoolExecutor(max_workers=os.cpu_count())
 
     async def get_porcupine(self, keyword_name: str, sensitivity: float) -> Detector:
         keyword = self.keywords.get(keyword_name)
@@ -56,24 +173,54 @@ class State:
             raise ValueError(f"No keyword {keyword_name}")
 
         # Check cache first for matching detector
-        async with self.detector_lock:
-            detectors = self.detector_cache.get(keyword_name, [])
-            detector = next(
-                (d for d in detectors if d.sensitivity == sensitivity), None
+        detectors = self.detector_cache.get(keyword_name, {}).get(
+            _sensitivity_key(sensitivity)
+        )
+        if detectors:
+            # Remove from cache for use
+            detector = detectors.pop()
+            self.num_cached[keyword_name] -= 1
+
+            _LOGGER.debug(
+                "Using detector for %s from cache (%s)",
+                keyword_name,
+                self.num_cached[keyword_name],
             )
-            if detector is not None:
-                # Remove from cache for use
-                detectors.remove(detector)
+            return detector
 
-                _LOGGER.debug(
-                    "Using detector for %s from cache (%s)",
-                    keyword_name,
-                    len(detectors),
-                )
-                return detector
+        # Model loading does file I/O, so keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, partial(self._create_detector, keyword_name, sensitivity)
+        )
 
+    def preload(self, keyword_names: Iterable[str], sensitivity: float) -> None:
+        """Load one detector per keyword into the cache ahead of time."""
+        for keyword_name in keyword_names:
+            self.cache_detector(
+                keyword_name, self._create_detector(keyword_name, sensitivity)
+            )
+
+    def cache_detector(self, keyword_name: str, detector: Detector) -> None:
+        """Return a detector to the cache for reuse."""
+        num_cached = self.num_cached.get(keyword_name, 0)
+        if num_cached >= self.max_cached_per_keyword:
+            # Free native model memory instead of holding it forever
+            _LOGGER.debug("Cache full for %s, deleting detector", keyword_name)
+            detector.porcupine.delete()
+            return
+
+        self.detector_cache.setdefault(keyword_name, {}).setdefault(
+            _sensitivity_key(detector.sensitivity), []
+        ).append(detector)
+        self.num_cached[keyword_name] = num_cached + 1
+
+    def _create_detector(self, keyword_name: str, sensitivity: float) -> Detector:
+        keyword = self.keywords[keyword_name]
         _LOGGER.debug("Loading %s for %s", keyword.name, keyword.language)
-        
+
+        import pvporcupine
+
         # Create the Porcupine detector with v3 API
         porcupine = pvporcupine.create(
             access_key=self.access_key,
@@ -99,6 +246,22 @@ async def main() -> None:
         default="en", 
         help="Language for wake words (en, fr, es, de)"
     )
+    parser.add_argument(
+        "--no-preload",
+        action="store_true",
+        help="Load wake word models on first use instead of at startup",
+    )
+    parser.add_argument(
+        "--preload-all-keywords",
+        action="store_true",
+        help=f"Preload every keyword instead of only {DEFAULT_KEYWORD}",
+    )
+    parser.add_argument(
+        "--max-cached-per-keyword",
+        type=int,
+        default=DEFAULT_MAX_CACHED_PER_KEYWORD,
+        help="Maximum number of idle detectors kept for each keyword",
+    )
     parser.add_argument("--debug", action="store_true", help="Log DEBUG messages")
     parser.add_argument(
         "--log-format", default=logging.BASIC_FORMAT, help="Format for log messages"
@@ -115,18 +278,22 @@ async def main() -> None:
     )
     _LOGGER.debug(args)
 
+    import pvporcupine
+
     # For v3, we need to get a list of available keywords for the specified language
     try:
         available_keywords = pvporcupine.KEYWORDS
         # Filter keywords for the requested language
-        language_keywords = [kw for kw in available_keywords if kw.startswith(args.language)]
-        
+        language_keywords = _get_language_index(available_keywords).get(
+            args.language, []
+        )
+
         # Create the keywords dictionary
         keywords: Dict[str, Keyword] = {}
         for kw in language_keywords:
             kw_name = kw.split("_")[0] if "_" in kw else kw
             keywords[kw_name] = Keyword(language=args.language, name=kw_name)
-            
+
         if not keywords:
             _LOGGER.warning(f"No keywords found for language {args.language}")
             _LOGGER.info(f"Available keywords: {', '.join(available_keywords)}")
@@ -165,7 +332,22 @@ async def main() -> None:
         ],
     )
 
-    state = State(access_key=args.access_key, keywords=keywords)
+    state = State(
+        access_key=args.access_key,
+        keywords=keywords,
+        max_cached_per_keyword=args.max_cached_per_keyword,
+    )
+
+    if not args.no_preload:
+        # Avoid loading models while the first client is streaming audio.
+        # Clients that don't send Detect use the default keyword.
+        if args.preload_all_keywords:
+            preload_names = list(keywords)
+        else:
+            preload_names = [DEFAULT_KEYWORD] if DEFAULT_KEYWORD in keywords else []
+
+        _LOGGER.debug("Preloading keyword(s): %s", preload_names)
+        state.preload(preload_names, args.sensitivity)
 
     _LOGGER.info("Ready")
 
@@ -176,14 +358,21 @@ async def main() -> None:
         await server.run(partial(Porcupine3EventHandler, wyoming_info, args, state))
     except KeyboardInterrupt:
         pass
+    finally:
+        state.executor.shutdown(wait=False)
 
 
 # -----------------------------------------------------------------------------
 
+EventHandlerMethod = Callable[["Porcupine3EventHandler", Event], Awaitable[None]]
+
 
 class Porcupine3EventHandler(AsyncEventHandler):
     """Event handler for clients."""
 
+    # Only needs to be unique within the process
+    _client_ids = itertools.count()
+
     def __init__(
         self,
         wyoming_info: Info,
@@ -196,91 +385,190 @@ class Porcupine3EventHandler(AsyncEventHandler):
 
         self.cli_args = cli_args
         self.wyoming_info_event = wyoming_info.event()
-        self.client_id = str(time.monotonic_ns())
+        self.not_detected_event = NotDetected().event()
+        self.client_id = next(self._client_ids)
         self.state = state
-        self.converter = AudioChunkConverter(rate=16000, width=2, channels=1)
-        self.audio_buffer = bytes()
+        self._loop = asyncio.get_running_loop()
+        self.converter = AudioChunkConverter(
+            rate=_RATE, width=_WIDTH, channels=_CHANNELS
+        )
+        self.audio_buffer = bytearray()
+        self._read_off = 0
         self.detected = False
 
         self.detector: Optional[Detector] = None
         self.keyword_name: str = ""
-        self.chunk_format: str = ""
         self.bytes_per_chunk: int = 0
+        self._frame = array.array("h")
+        self._frame_bytes = memoryview(self._frame).cast("B")
+        self._process_direct: Optional[Callable[[memoryview, int], int]] = None
 
         _LOGGER.debug("Client connected: %s", self.client_id)
 
     async def handle_event(self, event: Event) -> bool:
-        if Describe.is_type(event.type):
-            await self.write_event(self.wyoming_info_event)
-            _LOGGER.debug("Sent info to client: %s", self.client_id)
-            return True
-
-        if Detect.is_type(event.type):
-            detect = Detect.from_event(event)
-            if detect.names:
-                # TODO: use all names
-                await self._load_keyword(detect.names[0])
-        elif AudioStart.is_type(event.type):
-            self.detected = False
-        elif AudioChunk.is_type(event.type):
-            if self.detector is None:
-                # Default keyword
-                await self._load_keyword(DEFAULT_KEYWORD)
-
-            assert self.detector is not None
-
-            chunk = AudioChunk.from_event(event)
-            chunk = self.converter.convert(chunk)
-            self.audio_buffer += chunk.audio
+        handler = self._HANDLERS.get(event.type)
+        if handler is not None:
+            await handler(self, event)
 
-            while len(self.audio_buffer) >= self.bytes_per_chunk:
-                unpacked_chunk = struct.unpack_from(
-                    self.chunk_format, self.audio_buffer[: self.bytes_per_chunk]
-                )
-                keyword_index = self.detector.porcupine.process(unpacked_chunk)
-                if keyword_index >= 0:
-                    _LOGGER.debug(
-                        "Detected %s from client %s", self.keyword_name, self.client_id
-                    )
-                    await self.write_event(
-                        Detection(
-                            name=self.keyword_name, timestamp=chunk.timestamp
-                        ).event()
-                    )
-                    self.detected = True
-                    if AudioStop.is_type(event.type):
-                        return True
+        return True
 
-                self.audio_buffer = self.audio_buffer[self.bytes_per_chunk :]
+    async def disconnect(self) -> None:
+        if self.detector is not None:
+            # Let the next client reuse this detector
+            self.state.cache_detector(self.keyword_name, self.detector)
+            self.detector = None
 
-        elif AudioStop.is_type(event.type):
-            if not self.detected:
-                # Report no detection
-                await self.write_event(NotDetected().event())
+        _LOGGER.debug("Client disconnected: %s", self.client_id)
 
-        return True
+    async def _handle_describe(self, event: Event) -> None:
+        await self.write_event(self.wyoming_info_event)
+        _LOGGER.debug("Sent info to client: %s", self.client_id)
+
+    async def _handle_detect(self, event: Event) -> None:
+        detect = Detect.from_event(event)
+        if detect.names:
+            # TODO: use all names
+            await self._load_keyword(detect.names[0])
+
+    async def _handle_audio_start(self, event: Event) -> None:
+        self.detected = False
+
+    async def _handle_audio_chunk(self, event: Event) -> None:
+        if self.detector is None:
+            # Default keyword
+            await self._load_keyword(DEFAULT_KEYWORD)
+
+        assert self.detector is not None
+
+        chunk = AudioChunk.from_event(event)
+        if (
+            (chunk.rate != _RATE)
+            or (chunk.width != _WIDTH)
+            or (chunk.channels != _CHANNELS)
+        ):
+            chunk = self.converter.convert(chunk)
+
+        self.audio_buffer += chunk.audio
+
+        if len(self.audio_buffer) - self._read_off >= self.bytes_per_chunk:
+            # Process every complete frame in one trip to the thread pool
+            detections, self._read_off = await self._loop.run_in_executor(
+                self.state.executor, self._process_frames, self._read_off
+            )
+
+            for _ in range(detections):
+                _LOGGER.debug(
+                    "Detected %s from client %s", self.keyword_name, self.client_id
+                )
+                await self.write_event(
+                    Detection(name=self.keyword_name, timestamp=chunk.timestamp).event()
+                )
+                self.detected = True
+
+        if self._read_off > _COMPACT_BYTES:
+            # Drop consumed audio without copying on every frame
+            del self.audio_buffer[: self._read_off]
+            self._read_off = 0
+
+    async def _handle_audio_stop(self, event: Event) -> None:
+        if not self.detected:
+            # Report no detection
+            await self.write_event(self.not_detected_event)
+
+    # event type -> handler, other events are ignored
+    _HANDLERS: Dict[str, EventHandlerMethod] = {
+        _event_type(
+            AudioChunk(rate=_RATE, width=_WIDTH, channels=_CHANNELS, audio=bytes())
+        ): _handle_audio_chunk,
+        _event_type(
+            AudioStart(rate=_RATE, width=_WIDTH, channels=_CHANNELS)
+        ): _handle_audio_start,
+        _event_type(AudioStop()): _handle_audio_stop,
+        _event_type(Detect()): _handle_detect,
+        _event_type(Describe()): _handle_describe,
+    }
+
+    def _process_frames(self, start: int) -> Tuple[int, int]:
+        """Run all complete frames from start through Porcupine.
+
+        Returns the number of detections and the new read offset.
+        """
+        # Views stay in this thread, so the buffer can be resized afterwards
+        with memoryview(self.audio_buffer) as audio:
+            return self._process_view(audio, start)
+
+    def _process_view(self, audio: memoryview, start: int) -> Tuple[int, int]:
+        assert self.detector is not None
+
+        bytes_per_chunk = self.bytes_per_chunk
+        total = len(audio)
+        detections = 0
+        end = start + bytes_per_chunk
+
+        process_direct = self._process_direct
+        if process_direct is not None:
+            while end <= total:
+                if process_direct(audio, start) >= 0:
+                    detections += 1
+
+                start = end
+                end += bytes_per_chunk
+
+            return detections, start
+
+        process = self.detector.porcupine.process
+        frame = self._frame
+        frame_bytes = self._frame_bytes
+
+        while end <= total:
+            # Copy into the preallocated frame instead of a tuple of ints per frame
+            frame_bytes[:] = audio[start:end]
+            if _BIG_ENDIAN:
+                frame.byteswap()
+
+            if process(frame) >= 0:
+                detections += 1
+
+            start = end
+            end += bytes_per_chunk
+
+        return detections, start
 
     async def _load_keyword(self, keyword_name: str) -> None:
         """Load a specific wake word model."""
         if self.detector is not None:
             # Cache existing detector
-            async with self.state.detector_lock:
-                detectors = self.state.detector_cache.setdefault(self.keyword_name, [])
-                detectors.append(self.detector)
+            self.state.cache_detector(self.keyword_name, self.detector)
 
             self.detector = None
             self.keyword_name = ""
-            self.chunk_format = ""
             self.bytes_per_chunk = 0
+            self._process_direct = None
 
         self.detector = await self.state.get_porcupine(
             keyword_name, self.cli_args.sensitivity
         )
         self.keyword_name = keyword_name
-        self.chunk_format = f"{self.detector.porcupine.frame_length}h"
         self.bytes_per_chunk = self.detector.porcupine.frame_length * 2  # 16-bit
+        self._process_direct = _direct_process(self.detector.porcupine)
+
+        # Frame buffer for the fallback path, allocated once per keyword
+        self._frame = array.array("h", bytes(self.bytes_per_chunk))
+        self._frame_bytes = memoryview(self._frame).cast("B")
 
 
 def run():
     """Run from command-line."""
-    asyncio.run(main()) 
\ No newline at end of file
+    try:
+        # Faster event loop, not available on Windows
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+        return
+
+    if hasattr(uvloop, "run"):
+        # uvloop.install() is deprecated since 0.18
+        uvloop.run(main())
+    else:
+        uvloop.install()
+        asyncio.run(main())